@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+#
+# Shared helpers for the TDVF coverage analysis scripts.
+#
+# Copyright 2022 Intel Corporation
+# SPDX-License-Identifier: MIT
+
+import argparse
+import os
+import stat
+
+__all__ = ['dir_path', 'file_path', 'get_targets_from_file']
+
+
+def dir_path(path):
+    # a single stat() instead of the two syscalls behind os.path.isdir
+    try:
+        st = os.stat(path)
+    except OSError:
+        raise argparse.ArgumentTypeError(f'"{path}" does not exist')
+    if stat.S_ISDIR(st.st_mode):
+        return path
+    raise argparse.ArgumentTypeError(f'"{path}" is not a directory')
+
+
+def file_path(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        raise argparse.ArgumentTypeError(f'"{path}" does not exist')
+    if stat.S_ISREG(st.st_mode):
+        return path
+    raise argparse.ArgumentTypeError(f'"{path}" is not a file')
+
+
+def get_targets_from_file(file_path):
+    '''build a debug-file -> image-base mapping from a module table or text file'''
+    if file_path.endswith('.json'):
+        # only (d_path, img_base) is needed here - stream the pairs
+        # instead of materializing a validated module table; import
+        # lazily so --help and argument errors stay fast
+        from tdvf_module import TdvfModuleTable
+        return dict(TdvfModuleTable.iter_targets_from_json(file_path))
+    with open(file_path, 'r') as f:
+        return dict(line.strip().split(' ', 1) for line in f if line.strip())
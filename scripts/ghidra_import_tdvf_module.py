@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+#
+# Import TDVF module binaries into a Ghidra project for coverage analysis.
+#
+# Import targets are taken from a TDVF module table (.json) or from a
+# plain text file with one "<debug_path> <image_base>" pair per line.
+# Requires $GHIDRA_ROOT pointing to a Ghidra install (see 'make env').
+#
+# Copyright 2022 Intel Corporation
+# SPDX-License-Identifier: MIT
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import subprocess
+import sys
+
+from collections import defaultdict
+from pathlib import Path
+
+from _tdvf_common import dir_path, file_path, get_targets_from_file
+
+PROJ_NAME = 'tdvf_cov_analysis'
+
+
+@functools.lru_cache(maxsize=None)
+def _env(name):
+    try:
+        return os.environ[name]
+    except KeyError:
+        sys.exit(f'Error: Could not find ${name}. Missing \'make env\'?')
+
+
+@functools.lru_cache(maxsize=None)
+def _ghidra_bin():
+    return str(Path(_env('GHIDRA_ROOT')) / 'support' / 'analyzeHeadless')
+
+
+def _file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def ghidra_import_targets(targets, proj_dir, force=False):
+    '''import all target binaries into the Ghidra project, one JVM per image base'''
+    # hashing a target is orders of magnitude cheaper than re-importing
+    # it, so skip binaries the project already contains unchanged
+    manifest_path = os.path.join(proj_dir, 'imported.json')
+    manifest = {}
+    if not force and os.path.isfile(manifest_path):
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+
+    digests = {t: _file_digest(t) for t in targets}
+    by_base = defaultdict(list)
+    skipped = 0
+    for target, address in targets.items():
+        if manifest.get(target) == [digests[target], address]:
+            skipped += 1
+            continue
+        by_base[address].append(target)
+    if skipped:
+        print(f'Skipping {skipped} unchanged target(s) already in the project.')
+
+    failed = 0
+    for address, binaries in by_base.items():
+        # analyzeHeadless accepts multiple -import arguments, so all
+        # binaries sharing an image base amortize a single JVM startup
+        args = [_ghidra_bin(), proj_dir, PROJ_NAME]
+        for binary in binaries:
+            args += ['-import', binary]
+        args += ['-overwrite', '-loader', 'ElfLoader', '-loader-imagebase', address]
+
+        # stream output as it arrives instead of buffering the whole run -
+        # Ghidra imports are long and chatty, this keeps memory flat and
+        # gives immediate progress feedback
+        with subprocess.Popen(args, stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT,
+                              bufsize=1, text=True) as proc:
+            for line in proc.stdout:
+                sys.stdout.write(line)
+        if proc.returncode != 0:
+            failed += 1
+        else:
+            for binary in binaries:
+                manifest[binary] = [digests[binary], address]
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=4)
+
+    return failed == 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Import TDVF module binaries into a Ghidra project.')
+    parser.add_argument('proj_dir', type=dir_path,
+                        help='path to the Ghidra project directory')
+    parser.add_argument('module_file', type=file_path,
+                        help='module table (.json) or text file with '
+                             '"<debug_path> <image_base>" lines')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='re-import targets even if unchanged')
+    args = parser.parse_args()
+
+    targets = get_targets_from_file(args.module_file)
+    if not ghidra_import_targets(targets, args.proj_dir, args.force):
+        sys.exit('Error: one or more Ghidra imports failed.')
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+#
+# Helper classes to track TDVF module info for coverage analysis.
+#
+# A module table maps each TDVF module to its image base and the
+# location of its .text section, parsed from the module's .debug file.
+# Tables can be serialized to/from JSON for reuse across runs.
+#
+# Copyright 2022 Intel Corporation
+# SPDX-License-Identifier: MIT
+
+import bisect
+import contextlib
+import functools
+import json
+import mmap
+import os
+import struct
+import sys
+
+from operator import attrgetter
+from typing import List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# little-endian ELF64 file and section headers - enough to locate .text
+# without pulling the full pyelftools object graph into the hot path
+_ELF_EHDR = struct.Struct('<16sHHIQQQIHHHHHH')
+_ELF_SHDR = struct.Struct('<IIQQQQIIQQ')
+
+# many modules share their debug file directory - cache existence checks
+# so bulk table loads do not stat() the same paths over and over
+_path_exists = functools.lru_cache(maxsize=4096)(os.path.exists)
+
+
+def _find_text_section(buf):
+    '''scan the ELF64 section header table in buf for the .text section'''
+    ehdr = _ELF_EHDR.unpack_from(buf, 0)
+    e_ident, e_shoff = ehdr[0], ehdr[6]
+    e_shentsize, e_shnum, e_shstrndx = ehdr[11], ehdr[12], ehdr[13]
+    if e_ident[:4] != b'\x7fELF' or e_ident[4] != 2 or e_ident[5] != 1:
+        raise ValueError('not a little-endian ELF64 file')
+    shstr_off = _ELF_SHDR.unpack_from(buf, e_shoff + e_shstrndx * e_shentsize)[4]
+    for i in range(e_shnum):
+        shdr = _ELF_SHDR.unpack_from(buf, e_shoff + i * e_shentsize)
+        name_off = shstr_off + shdr[0]
+        if buf[name_off:name_off + 6] == b'.text\x00':
+            return shdr[4], shdr[5]
+    raise LookupError('could not find .text section')
+
+
+@functools.lru_cache(maxsize=4096)
+def _read_text_section(path, mtime_ns, size):
+    '''parse (offset, size) of the .text section, cached per file stat'''
+    with open(path, 'rb') as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _find_text_section(mm)
+        except ValueError:
+            # unusual ELF flavor - let pyelftools figure it out
+            from elftools.elf.elffile import ELFFile
+            section = ELFFile(f).get_section_by_name('.text')
+            if section is None:
+                raise LookupError(f'could not find .text section in "{path}"')
+            return section['sh_offset'], section['sh_size']
+
+
+class Address(int):
+    '''A 64-bit address with hex string representation'''
+
+    __slots__ = ()
+
+    def __new__(cls, value=0):
+        if isinstance(value, Address):
+            # already validated, and immutable - reuse as-is
+            return value
+        if isinstance(value, str):
+            value = int(value, 16)
+        # value >> 64 is non-zero for anything outside [0, 2^64):
+        # negative values shift to -1, oversized ones keep high bits
+        if not isinstance(value, int) or value >> 64:
+            raise ValueError(f'invalid 64-bit address {value!r}')
+        return super().__new__(cls, value)
+
+    @property
+    def value(self):
+        return int(self)
+
+    @property
+    def address(self):
+        return format(self, '#x')
+
+    def __str__(self):
+        return self.address
+
+
+def _addr_int(value):
+    '''coerce a hex string, Address or int to a validated plain int'''
+    if isinstance(value, str):
+        value = int(value, 16)
+    if not isinstance(value, int) or value >> 64:
+        raise ValueError(f'invalid 64-bit address {value!r}')
+    return int(value)
+
+
+class TdvfModule:
+    '''A single TDVF module with image base and .text section info'''
+
+    __slots__ = ('_name', '_img_base', '_t_start', '_t_end', '_t_size', '_d_path',
+                 '_cached_dict')
+
+    def __init__(self, name, img_base=0, t_start=0, t_end=0, t_size=0, d_path=''):
+        self._name = name
+        self.img_base = img_base
+        self.t_start = t_start
+        self.t_end = t_end
+        self.t_size = t_size
+        self.d_path = d_path
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def img_base(self):
+        return self._img_base
+
+    @img_base.setter
+    def img_base(self, address):
+        self._img_base = _addr_int(address)
+        self._cached_dict = None
+
+    @property
+    def t_start(self):
+        return self._t_start
+
+    @t_start.setter
+    def t_start(self, address):
+        self._t_start = _addr_int(address)
+        self._cached_dict = None
+
+    @property
+    def t_end(self):
+        return self._t_end
+
+    @t_end.setter
+    def t_end(self, address):
+        self._t_end = _addr_int(address)
+        self._cached_dict = None
+
+    @property
+    def t_size(self):
+        return self._t_size
+
+    @t_size.setter
+    def t_size(self, size):
+        if not isinstance(size, int) or size < 0:
+            raise ValueError(f'invalid .text size {size!r}')
+        self._t_size = size
+        self._cached_dict = None
+
+    @property
+    def d_path(self):
+        return self._d_path
+
+    @d_path.setter
+    def d_path(self, path):
+        if path and not _path_exists(path):
+            raise ValueError(f'module path "{path}" does not exist')
+        self._d_path = path
+        self._cached_dict = None
+
+    def _set_d_path_trusted(self, path):
+        '''assign a debug file path the caller has already verified'''
+        self._d_path = path
+        self._cached_dict = None
+
+    @classmethod
+    def _unchecked(cls, name, img_base, t_start, t_end, t_size, d_path):
+        '''fast constructor for trusted input - skips setter validation'''
+        module = cls.__new__(cls)
+        module._name = name
+        module._img_base = _addr_int(img_base)
+        module._t_start = _addr_int(t_start)
+        module._t_end = _addr_int(t_end)
+        module._t_size = t_size
+        module._d_path = d_path
+        module._cached_dict = None
+        return module
+
+    def get_toffset_and_tsize(self):
+        '''parse offset and size of this module's .text section from its debug file'''
+        if not self.d_path:
+            raise ValueError(f'module {self.name} is missing its debug file path')
+        st = os.stat(self.d_path)
+        return _read_text_section(self.d_path, st.st_mtime_ns, st.st_size)
+
+    def compute_tstart(self, t_offset):
+        return self.img_base + t_offset
+
+    def compute_tend(self):
+        return self.t_start + self.t_size
+
+    def fill_text_info(self):
+        '''fill in .text start, end and size from this module's debug file'''
+        t_offset, t_size = self.get_toffset_and_tsize()
+        self.t_size = t_size
+        self.t_start = self.compute_tstart(t_offset)
+        self.t_end = self.compute_tend()
+
+    def set_module_paths(self, search_dir):
+        '''locate this module's debug file in the given search directory'''
+        path = os.path.join(search_dir, self.name + '.debug')
+        if os.path.isfile(path):
+            self.d_path = path
+
+    def to_dict(self):
+        # modules are typically built once and then read many times
+        # (printing, serialization) - cache until a setter runs
+        if self._cached_dict is not None:
+            return self._cached_dict
+        self._cached_dict = {
+            'name': self.name,
+            'img_base': format(self._img_base, '#x'),
+            't_start': format(self._t_start, '#x'),
+            't_end': format(self._t_end, '#x'),
+            't_size': self.t_size,
+            'd_path': self.d_path,
+        }
+        return self._cached_dict
+
+    def from_dict(self, info):
+        self.img_base = info['img_base']
+        self.t_start = info['t_start']
+        self.t_end = info['t_end']
+        self.t_size = info['t_size']
+        self.d_path = info['d_path']
+
+    def __str__(self):
+        return str(self.to_dict())
+
+    @property
+    def _sort_key(self):
+        # Address is an int, so this tuple compares at C level
+        return (self._t_start, self._t_end)
+
+    def __lt__(self, other):
+        return self._sort_key < other._sort_key
+
+
+class TdvfModuleTable:
+    '''A table of TDVF modules, sorted by .text start address'''
+
+    __slots__ = ('_TdvfModuleTable__modules', '_TdvfModuleTable__by_name',
+                 '_TdvfModuleTable__range_index')
+
+    def __init__(self, module_list: List[TdvfModule] = None):
+        self.modules = module_list if module_list is not None else []
+
+    @staticmethod
+    def __validate_module(module):
+        if not isinstance(module, TdvfModule):
+            raise TypeError(f'invalid module type {type(module)}')
+        if not module.name:
+            raise ValueError('module is missing a name')
+
+    @property
+    def modules(self):
+        return self.__modules
+
+    @modules.setter
+    def modules(self, module_list):
+        # validate and index in a single pass, then sort once
+        modules = []
+        by_name = {}
+        for module in module_list:
+            self.__validate_module(module)
+            modules.append(module)
+            by_name[module.name] = module
+        modules.sort(key=attrgetter('_sort_key'))
+        self.__modules = modules
+        self.__by_name = by_name
+        self.__range_index = None
+
+    def add_module(self, module):
+        self.__validate_module(module)
+        bisect.insort(self.__modules, module)
+        self.__by_name[module.name] = module
+        self.__range_index = None
+
+    def get_module(self, name):
+        try:
+            return self.__by_name[name]
+        except KeyError:
+            raise KeyError(f'module table does not contain module "{name}"')
+
+    def fill_text_info(self):
+        # map all debug files as one batch and run the struct scan over
+        # each - per-module open/parse/close churn dominates otherwise
+        with contextlib.ExitStack() as stack:
+            for module in self.__modules:
+                f = stack.enter_context(open(module.d_path, 'rb'))
+                mm = stack.enter_context(
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                try:
+                    t_offset, t_size = _find_text_section(mm)
+                except ValueError:
+                    # unusual ELF flavor - go through the cached slow path
+                    t_offset, t_size = module.get_toffset_and_tsize()
+                module.t_size = t_size
+                module.t_start = module.compute_tstart(t_offset)
+                module.t_end = module.compute_tend()
+        self.__range_index = None
+
+    def __get_range_index(self):
+        # SoA views of the sorted .text ranges, rebuilt lazily after
+        # table or text-info changes
+        if self.__range_index is None:
+            self.__range_index = (
+                [m.t_start for m in self.__modules],
+                [m.t_end for m in self.__modules])
+        return self.__range_index
+
+    def find_by_address(self, address):
+        '''return the module whose .text contains the address, or None'''
+        starts, ends = self.__get_range_index()
+        i = bisect.bisect_right(starts, address) - 1
+        if i >= 0 and address < ends[i]:
+            return self.__modules[i]
+        return None
+
+    def lookup_batch(self, addresses):
+        '''map each address to the module whose .text contains it (or None)'''
+        starts, ends = self.__get_range_index()
+        modules = self.__modules
+        locate = bisect.bisect_right
+        result = []
+        append = result.append
+        for address in addresses:
+            i = locate(starts, address) - 1
+            if i >= 0 and address < ends[i]:
+                append(modules[i])
+            else:
+                append(None)
+        return result
+
+    def set_module_paths(self, search_dir):
+        # one scandir for the whole table instead of an isfile() stat
+        # per module - the directory listing answers every lookup
+        names = {e.name for e in os.scandir(search_dir) if e.is_file()}
+        for module in self.__modules:
+            fname = module.name + '.debug'
+            if fname in names:
+                # the scandir above already proved the file exists -
+                # skip the setter's stat()
+                module._set_d_path_trusted(os.path.join(search_dir, fname))
+
+    def __str__(self):
+        rows = [f'{module.name} {module.img_base:#x} {module.t_start:#x} '
+                f'{module.t_end:#x} {module.t_size} {module.d_path}'
+                for module in self.__modules]
+        return '\n'.join(rows)
+
+    def print_table(self, only_modules=None):
+        # bind the row format once instead of re-parsing an f-string
+        # spec per module
+        fmt = '{:<32} 0x{:016x} 0x{:016x} 0x{:016x} {:<9}'.format
+        only = frozenset(only_modules) if only_modules else None
+        rows = ['{:<32} {:<18} {:<18} {:<18} {:<9}'.format(
+            'Module', 'Image Base', 'Text Start', 'Text End', 'Text Size')]
+        for module in self.__modules:
+            if only is not None and module.name not in only:
+                continue
+            rows.append(fmt(module.name, module.img_base, module.t_start,
+                            module.t_end, module.t_size))
+        sys.stdout.write('\n'.join(rows) + '\n')
+
+    def print_modules(self, only_modules=None):
+        # pre-built format + one write instead of parsing an f-string
+        # and flushing stdout per row
+        fmt = '{:<32} {:012x} {:012x} {:012x} {:<6} {}\n'.format
+        only = frozenset(only_modules) if only_modules else None
+        out = []
+        for module in self.__modules:
+            if only is not None and module.name not in only:
+                continue
+            out.append(fmt(module.name, module.img_base, module.t_start,
+                           module.t_end, module.t_size, module.d_path))
+        sys.stdout.write(''.join(out))
+
+    def to_json(self, only_modules=None):
+        if only_modules:
+            only = frozenset(only_modules)
+            modules = [m.to_dict() for m in self.__modules if m.name in only]
+        else:
+            modules = [m.to_dict() for m in self.__modules]
+        return json.dumps(modules, indent=4)
+
+    def write_to_file(self, file_name, only_modules=None):
+        if only_modules:
+            only = frozenset(only_modules)
+            modules = [m for m in self.__modules if m.name in only]
+        else:
+            modules = self.__modules
+        if orjson:
+            with open(file_name, 'wb') as f:
+                f.write(orjson.dumps(modules, default=lambda m: m.to_dict(),
+                                     option=orjson.OPT_INDENT_2))
+        else:
+            # serialize straight into the file, one module at a time,
+            # instead of materializing the whole document first
+            with open(file_name, 'w') as f:
+                f.write('[')
+                for i, module in enumerate(modules):
+                    f.write(',\n' if i else '\n')
+                    json.dump(module.to_dict(), f, indent=4)
+                f.write('\n]')
+
+    @staticmethod
+    def iter_targets_from_json(file_name):
+        '''yield (d_path, img_base) pairs without building TdvfModule objects'''
+        with open(file_name, 'rb') as f:
+            data = orjson.loads(f.read()) if orjson else json.load(f)
+        for info in data:
+            yield info['d_path'], info['img_base']
+
+    def read_from_file(self, file_name):
+        with open(file_name, 'rb') as f:
+            module_info = orjson.loads(f.read()) if orjson else json.load(f)
+        # build the whole batch unchecked, then sort and index once
+        # instead of paying an insort per module
+        modules = [TdvfModule._unchecked(
+            info['name'], info['img_base'], info['t_start'],
+            info['t_end'], info['t_size'], info['d_path'])
+            for info in module_info]
+        self.__modules = sorted(self.__modules + modules,
+                                key=attrgetter('_sort_key'))
+        self.__by_name = {m.name: m for m in self.__modules}
+        self.__range_index = None
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+#
+# Print a TDVF module table generated for coverage analysis.
+#
+# Copyright 2022 Intel Corporation
+# SPDX-License-Identifier: MIT
+
+import argparse
+
+from _tdvf_common import file_path, get_targets_from_file
+from tdvf_module import TdvfModuleTable
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Print a TDVF module table.')
+    parser.add_argument('module_file', type=file_path,
+                        help='module table (.json) or text file with '
+                             '"<debug_path> <image_base>" lines')
+    parser.add_argument('-m', '--modules', nargs='+', metavar='NAME',
+                        help='only print the given modules')
+    parser.add_argument('-l', '--long', action='store_true',
+                        help='include debug file paths in the listing')
+    parser.add_argument('-t', '--targets', action='store_true',
+                        help='print Ghidra import targets instead of the table')
+    args = parser.parse_args()
+
+    if args.targets:
+        for path, address in get_targets_from_file(args.module_file).items():
+            print(f'{path} {address}')
+    else:
+        table = TdvfModuleTable()
+        table.read_from_file(args.module_file)
+        if args.long:
+            table.print_modules(args.modules)
+        else:
+            table.print_table(args.modules)